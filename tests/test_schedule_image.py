@@ -0,0 +1,93 @@
+"""스케줄 이미지 렌더링 회귀 테스트
+
+views/schedule.py는 Streamlit 페이지 스크립트이므로, '메인 앱' 구역 앞의 함수 정의 부분만 실행해 사용
+(DB 클라이언트는 사용하지 않으므로 utils.auth는 더미 모듈로 대체)
+"""
+import sys
+import types
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from PIL import Image
+
+SCHEDULE_PY = Path(__file__).resolve().parent.parent / "views" / "schedule.py"
+
+
+@pytest.fixture(scope="module")
+def monkeypatch_module():
+    mp = pytest.MonkeyPatch()
+    yield mp
+    mp.undo()
+
+
+@pytest.fixture(scope="module")
+def schedule(monkeypatch_module):
+    auth = types.ModuleType("utils.auth")
+    auth.get_supabase_client = lambda: None
+    auth.is_authenticated = lambda: True
+    auth.can_edit = lambda *_: True
+    monkeypatch_module.setitem(sys.modules, "utils.auth", auth)
+
+    src = SCHEDULE_PY.read_text(encoding="utf-8")
+    cut = src.rfind("# ====", 0, src.index("# 메인 앱"))
+    ns = {"__file__": str(SCHEDULE_PY), "__name__": "schedule_under_test"}
+    exec(compile(src[:cut], str(SCHEDULE_PY), "exec"), ns)
+    # 폰트 탐색·다운로드 없이 기본 폰트로 렌더링
+    ns["get_korean_font_path"] = lambda: None
+    ns["get_korean_font_path_bold"] = lambda: None
+    return ns
+
+
+def _week_df(first_product="제품A"):
+    rows = []
+    for k, day in enumerate(["월", "화", "수", "목", "금"]):
+        for shift in ["주간", "야간"]:
+            rows.append({
+                "day_of_week": f"10/{12 + k:02d} ({day})",
+                "shift": shift,
+                "product": first_product if not rows else f"제품{k}{shift}",
+                "quantity": 10,
+                "production_time": 0.5,
+            })
+    return pd.DataFrame(rows)
+
+
+def _render(schedule, df, paper_size):
+    png = schedule["generate_schedule_image"](df, "2026-10-12 ~ 2026-10-16", paper_size).getvalue()
+    return np.asarray(Image.open(BytesIO(png)).convert("RGB"))
+
+
+@pytest.mark.parametrize("paper_size, scale", [("A4", 2), ("A3", 3)])
+def test_normal_items_leave_right_margin_blank(schedule, paper_size, scale):
+    img = _render(schedule, _week_df(), paper_size)
+    margin = img[:, img.shape[1] - 40 * scale + 1:]
+    assert (margin == 255).all()
+
+
+@pytest.mark.parametrize("paper_size, scale", [("A4", 2), ("A3", 3)])
+def test_long_product_name_runs_to_image_edge(schedule, paper_size, scale):
+    # 기존 렌더링처럼 열 너비를 넘는 항목은 잘리지 않고 이미지 오른쪽 끝까지 그려져야 함
+    img = _render(schedule, _week_df("X" * 1000), paper_size)
+    ink_cols = np.nonzero((img[:, img.shape[1] - 40 * scale + 1:] != 255).any(axis=(0, 2)))[0]
+    assert ink_cols.size > 0
+    assert ink_cols.max() == 40 * scale - 2
+
+
+@pytest.mark.parametrize("steps", [16, 24])
+def test_palette_keeps_theme_colors_exact(schedule, steps):
+    theme = ["#FFFFFF", "#2C3E50", "#FFF9E6", "#E8D5A0", "#EEF0F8", "#B0B8D0", "#E8F4FD", "#B0D4E8",
+             "#333333", "#999999", "#DDDDDD", "#555555", "#B8860B", "#4A5080"]
+    palette = schedule["_make_schedule_palette"](
+        theme,
+        [("#333333", "#FFFFFF"), ("#333333", "#E8F4FD"), ("#333333", "#FFF9E6"), ("#333333", "#EEF0F8"),
+         ("#555555", "#FFFFFF"), ("#FFFFFF", "#2C3E50"), ("#B8860B", "#FFF9E6"), ("#4A5080", "#EEF0F8"),
+         ("#999999", "#FFF9E6"), ("#999999", "#EEF0F8")],
+        steps=steps,
+    )
+    src = Image.new("RGB", (len(theme), 1))
+    src.putdata([Image.new("RGB", (1, 1), c).getpixel((0, 0)) for c in theme])
+    out = src.quantize(palette=palette, dither=Image.Dither.NONE).convert("RGB")
+    assert (np.asarray(out) == np.asarray(src)).all()
@@ -15,13 +15,19 @@ def _get_anon_client():
 
 
 def get_supabase_client():
-    """로그인 상태면 인증된 클라이언트, 아니면 anon 클라이언트 반환"""
+    """로그인 상태면 인증된 클라이언트, 아니면 anon 클라이언트 반환
+    인증 클라이언트는 세션별로 한 번만 생성해 재사용 (로그인 세션이 바뀌면 새로 생성)
+    """
     session = st.session_state.get("auth_session")
     if session:
+        cached = st.session_state.get("_auth_client")
+        if cached is not None and cached[0] == session.access_token:
+            return cached[1]
         url = st.secrets["SUPABASE_URL"]
         key = st.secrets["SUPABASE_KEY"]
         client = create_client(url, key)
         client.auth.set_session(session.access_token, session.refresh_token)
+        st.session_state["_auth_client"] = (session.access_token, client)
         return client
     return _get_anon_client()
 
@@ -52,6 +58,7 @@ def logout():
     """로그아웃 - 세션 클리어"""
     st.session_state.pop("auth_session", None)
     st.session_state.pop("auth_user", None)
+    st.session_state.pop("_auth_client", None)
     _fetch_anonymous_permissions.clear()
 
 
@@ -1,11 +1,12 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import math
+import hashlib
 from datetime import datetime, timedelta
-import plotly.express as px
-import plotly.graph_objects as go
 from io import BytesIO
-from PIL import Image, ImageDraw, ImageFont
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageColor, ImageDraw, ImageFont
 import os
 from utils.auth import get_supabase_client, is_authenticated, can_edit
 
@@ -50,6 +51,13 @@ EXCLUSIVE_PRODUCTS = {"F0000047", "F0000048", "F0000050", "F0000078"}
 # 생산량 집계 제외 제품: daily_sum에 포함하지 않아 교대별 상한에 영향 안 줌
 EXCLUDE_FROM_LIMIT = {"E0000072", "E0000073"}
 
+# 통계 화면에서 사용하는 스케줄 컬럼
+STATS_COLUMNS = "day_of_week, shift, product, quantity, production_time, urgency"
+
+# 주차 선택 목록: 한 번에 표시할 주차 수 / 주차 조회 시 한 번에 가져올 행 수
+WEEK_PAGE_SIZE = 25
+WEEK_FETCH_CHUNK = 1000
+
 # ========================
 # 유틸리티 함수
 # ========================
@@ -68,6 +76,10 @@ def get_allowed_shifts(production_timing):
         return ['야간']
     return ['주간', '야간']
 
+def get_day_keys(day_of_week):
+    """'10/13 (월)' 형식의 요일 라벨 Series에서 요일 문자(월~금)만 추출"""
+    return day_of_week.astype(str).str.extract(r"\(([^()]*)\)\s*$", expand=False)
+
 def get_urgency(reason, product, deadline_days, is_next_week):
     urgency = 0
     if "2일치 부족" in reason:
@@ -102,34 +114,26 @@ def get_chosung_string(text):
     """문자열의 초성 추출"""
     return ''.join(get_chosung(c) for c in text)
 
-def is_chosung_only(text):
-    """입력이 초성만으로 이루어져 있는지 확인"""
-    chosung_set = set(CHOSUNG_LIST)
-    return all(c in chosung_set for c in text if c.strip())
-
-def match_chosung(query, target):
-    """초성 검색 매칭 - query가 target의 초성에 포함되는지"""
-    if not query:
-        return True
+@st.cache_data(ttl=300)
+def build_chosung_index(names):
+    """제품명 목록의 소문자·초성 문자열을 미리 계산한 검색 인덱스 (캐시 5분)"""
+    lower = pd.Series(list(names), dtype=object).astype(str).str.lower().str.strip()
+    return pd.DataFrame({
+        "name": list(names),
+        "lower": lower,
+        "chosung": lower.map(get_chosung_string),
+    })
+
+def search_chosung_index(index_df, query):
+    """초성 검색 - query가 제품명 또는 제품명의 초성(혼합 포함)에 포함되는 행의 마스크 반환"""
     query_lower = query.lower().strip()
-    target_lower = target.lower().strip()
-    
+    if not query_lower:
+        return pd.Series(True, index=index_df.index)
     # 일반 텍스트 포함 검색
-    if query_lower in target_lower:
-        return True
-    
-    # 초성 검색
-    if is_chosung_only(query_lower):
-        target_chosung = get_chosung_string(target_lower)
-        if query_lower in target_chosung:
-            return True
-    
-    # 혼합 검색 (초성 + 일반 문자)
-    target_chosung = get_chosung_string(target_lower)
-    if query_lower in target_chosung:
-        return True
-    
-    return False
+    mask = index_df["lower"].str.contains(query_lower, regex=False)
+    # 초성 검색 (초성 + 일반 문자 혼합 포함)
+    mask |= index_df["chosung"].str.contains(query_lower, regex=False)
+    return mask
 
 @st.cache_data(ttl=300)
 def load_all_product_names():
@@ -239,14 +243,14 @@ def calc_avg_sales_by_dow(sales_df):
         if sub_df.empty:
             return {}
         # 쉬는날 제외: 해당 날짜의 전체 판매량이 0인 날은 평균 계산에서 제외
-        daily_total = sub_df.groupby("sale_date_dt")["quantity"].sum()
+        daily_total = sub_df.groupby("sale_date_dt", sort=False)["quantity"].sum()
         rest_days = set(daily_total[daily_total == 0].index)
         filtered_df = sub_df[~sub_df["sale_date_dt"].isin(rest_days)]
         if filtered_df.empty:
             return {}
         date_dow = filtered_df[["sale_date_dt", "dow"]].drop_duplicates()
-        dow_count = date_dow.groupby("dow").size().to_dict()
-        grouped = filtered_df.groupby(["product_code", "dow"])["quantity"].sum().reset_index()
+        dow_count = date_dow.groupby("dow", sort=False).size().to_dict()
+        grouped = filtered_df.groupby(["product_code", "dow"], sort=False)["quantity"].sum().reset_index()
         avg_map = {}
         for _, row in grouped.iterrows():
             code = row["product_code"]
@@ -350,7 +354,9 @@ def parse_inventory_file(uploaded_file):
 
 @st.cache_data(ttl=300)
 def load_inventory_from_db():
-    """uploaded_products DB에서 재고 + 생산정보를 가져와 inventory_df 형태로 반환 (캐시 5분)"""
+    """uploaded_products DB에서 재고 + 생산정보를 가져와 inventory_df 형태로 반환 (캐시 5분)
+    제품코드·제품·생산시점은 여기서 문자열 정규화(strip)하므로 사용하는 쪽에서 다시 변환하지 않음
+    """
     result = supabase.table("uploaded_products").select("*").order("id").execute()
     if not result.data:
         return pd.DataFrame(columns=["제품코드", "제품", "현 재고", "개당 생산시간(초)", "생산시점", "최소생산수량"])
@@ -377,54 +383,38 @@ def build_weekly_data(avg_sales_map, inventory_df):
     avg_sales_map: { product_code: {0: avg_mon, 1: avg_tue, ...} }
     반환: DataFrame (제품, 제품코드, 현 재고, 월~금, 다음주월, 다음주화, 생산시점, 최소생산수량)
     """
-    rows = []
-    unmatched = []
-
-    for _, inv_row in inventory_df.iterrows():
-        product_code = str(inv_row["제품코드"]).strip()
-        product_name = str(inv_row["제품"]).strip()
-        stock = int(inv_row.get("현 재고", 0))
-        prod_time = int(inv_row.get("개당 생산시간(초)", 0))
-        timing = str(inv_row.get("생산시점", "주야")).strip()
-        min_qty = int(inv_row.get("최소생산수량", 0)) if "최소생산수량" in inv_row.index else 0
-
-        # 최소생산수량 > 0 인 제품만 대상
-        if min_qty <= 0:
-            continue
-
-        avg = avg_sales_map.get(product_code)
-        if avg is None:
-            unmatched.append(product_name)
-            continue
-
-        mon = avg.get(0, 0)
-        tue = avg.get(1, 0)
-        wed = avg.get(2, 0)
-        thu = avg.get(3, 0)
-        fri = avg.get(4, 0)
-        sat = avg.get(5, 0)
-        weekly_sum = mon + tue + wed + thu + fri + sat
-
-        row = {
-            "제품": product_name,
-            "제품코드": product_code,
-            "월": mon,
-            "화": tue,
-            "수": wed,
-            "목": thu,
-            "금": fri,
-            "토": sat,
-            "합계": weekly_sum,
-            "다음주월": avg.get(0, 0),  # 다음주 월요일 = 월요일 평균
-            "다음주화": avg.get(1, 0),  # 다음주 화요일 = 화요일 평균
-            "현 재고": stock,
-            "개당 생산시간(초)": prod_time,
-            "최소생산수량": min_qty,
-            "생산시점": timing,
-        }
-        rows.append(row)
-
-    return pd.DataFrame(rows), unmatched
+    def _int_col(col):
+        if col in inventory_df.columns:
+            return inventory_df[col].astype(int)
+        return pd.Series(0, index=inventory_df.index)
+
+    # 제품코드·제품·생산시점은 load_inventory_from_db에서 이미 정규화됨
+    product_codes = inventory_df["제품코드"]
+    product_names = inventory_df["제품"]
+    min_qty = _int_col("최소생산수량")
+    timing = inventory_df["생산시점"] if "생산시점" in inventory_df.columns else pd.Series("주야", index=inventory_df.index)
+
+    # 최소생산수량 > 0 인 제품만 대상, 판매 데이터 매칭 여부는 dict 조회로 한 번에 판정
+    is_target = min_qty > 0
+    is_matched = product_codes.isin(avg_sales_map.keys())
+    unmatched = product_names[is_target & ~is_matched].tolist()
+
+    sel = is_target & is_matched
+    codes = product_codes[sel].tolist()
+    avgs = [avg_sales_map[code] for code in codes]
+
+    weekly_df = pd.DataFrame({"제품": product_names[sel].tolist(), "제품코드": codes})
+    for dow, d in enumerate(DAYS + ["토"]):
+        weekly_df[d] = [avg.get(dow, 0) for avg in avgs]
+    weekly_df["합계"] = weekly_df[DAYS + ["토"]].sum(axis=1)
+    weekly_df["다음주월"] = weekly_df["월"]  # 다음주 월요일 = 월요일 평균
+    weekly_df["다음주화"] = weekly_df["화"]  # 다음주 화요일 = 화요일 평균
+    weekly_df["현 재고"] = _int_col("현 재고")[sel].tolist()
+    weekly_df["개당 생산시간(초)"] = _int_col("개당 생산시간(초)")[sel].tolist()
+    weekly_df["최소생산수량"] = min_qty[sel].tolist()
+    weekly_df["생산시점"] = timing[sel].tolist()
+
+    return weekly_df, unmatched
 
 
 # ========================
@@ -701,6 +691,12 @@ def create_schedule_from_weekly(weekly_df, start_date):
                     if is_exclusive:
                         exclusive_placed[day] = p_code
 
+    # 배치 확정 후 항목별 소요시간(h) 한 번만 계산 (저장·화면 표시에서 재사용)
+    for day in DAYS:
+        for items in schedule[day].values():
+            for info in items.values():
+                info['hours'] = round(info['qty'] * info['sec'] / 3600, 1)
+
     return schedule, daily_sum, daily_time, date_labels, monday
 
 # ========================
@@ -711,6 +707,9 @@ def _clear_schedule_db_caches():
     """스케줄 DB 관련 캐시 일괄 클리어"""
     load_schedule_from_db.clear()
     get_all_weeks.clear()
+    get_week_options.clear()
+    count_schedule_rows.clear()
+    compute_week_aggregates.clear()
 
 def delete_schedule(week_start):
     client = get_supabase_client()
@@ -719,11 +718,26 @@ def delete_schedule(week_start):
     ).execute()
     _clear_schedule_db_caches()
 
-def check_schedule_exists(week_start):
+def _query_schedule_row_count(week_start_str):
+    """주차별 스케줄 행 수 직접 조회 (캐시 없음). week_start_str: 'YYYY-MM-DD' 문자열"""
     result = supabase.table("schedules").select("id", count="exact").eq(
-        "week_start", week_start.strftime('%Y-%m-%d')
+        "week_start", week_start_str
     ).execute()
-    return result.count > 0
+    return result.count or 0
+
+@st.cache_data(ttl=300)
+def count_schedule_rows(week_start_str):
+    """주차별 스케줄 행 수 조회 (화면 표시용, 캐시 5분)"""
+    return _query_schedule_row_count(week_start_str)
+
+def check_schedule_exists(week_start, fresh=False):
+    """주차 스케줄 존재 여부
+    fresh=True: 캐시를 거치지 않고 DB를 직접 조회 (다른 세션의 변경을 반영해야 하는 삭제/생성 판단용)
+    """
+    week_start_str = week_start.strftime('%Y-%m-%d')
+    if fresh:
+        return _query_schedule_row_count(week_start_str) > 0
+    return count_schedule_rows(week_start_str) > 0
 
 def save_schedule_to_db(schedule, date_labels, monday):
     client = get_supabase_client()
@@ -739,7 +753,7 @@ def save_schedule_to_db(schedule, date_labels, monday):
                     "shift": shift,
                     "product": product,
                     "quantity": data['qty'],
-                    "production_time": round(data['qty'] * data['sec'] / 3600, 1),
+                    "production_time": data['hours'],
                     "reason": data['reason'],
                     "urgency": data['urgency']
                 })
@@ -748,127 +762,330 @@ def save_schedule_to_db(schedule, date_labels, monday):
     _clear_schedule_db_caches()
 
 @st.cache_data(ttl=300)
-def load_schedule_from_db(week_start_str):
-    """스케줄 데이터 로드 (캐시 5분). week_start_str: 'YYYY-MM-DD' 문자열"""
-    result = supabase.table("schedules").select("*").eq(
+def load_schedule_from_db(week_start_str, columns="*", order_by="id"):
+    """스케줄 데이터 로드 (캐시 5분). week_start_str: 'YYYY-MM-DD' 문자열
+    columns: 조회할 컬럼 (쉼표 구분, 기본 전체) — 일부 컬럼만 쓰는 화면은 필요한 컬럼만 지정
+    """
+    result = supabase.table("schedules").select(columns).eq(
         "week_start", week_start_str
-    ).order("id").execute()
+    ).order(order_by).execute()
     if result.data:
         return pd.DataFrame(result.data)
     return pd.DataFrame()
 
-def delete_schedule_row(row_id):
-    """단일 행 삭제"""
+def apply_schedule_edits(week_start_str, pending_edits, pending_deletes):
+    """수정 모드에서 모아둔 수정/삭제를 일괄 반영 (upsert 1회 + delete 1회)
+    pending_edits: {row_id: {컬럼: 새 값}}, pending_deletes: {row_id, ...}
+    """
     client = get_supabase_client()
-    client.table("schedules").delete().eq("id", row_id).execute()
+    if pending_deletes:
+        client.table("schedules").delete().in_("id", list(pending_deletes)).execute()
+    edit_ids = [rid for rid in pending_edits if rid not in pending_deletes]
+    if edit_ids:
+        # upsert는 행 전체를 보내야 하므로 현재 행에 수정 값을 덮어써서 전송
+        current = load_schedule_from_db(week_start_str)
+        current = current[current["id"].isin(edit_ids)]
+        current = current.astype(object).where(current.notna(), None)
+        rows = []
+        for row in current.to_dict("records"):
+            row.update(pending_edits[row["id"]])
+            rows.append(row)
+        if rows:
+            client.table("schedules").upsert(rows).execute()
     _clear_schedule_db_caches()
 
-def update_schedule_row(row_id, day_of_week=None, shift=None, quantity=None, production_time=None):
-    """단일 행 수정 (이동 또는 수량 변경)"""
-    client = get_supabase_client()
-    updates = {}
-    if day_of_week is not None:
-        updates["day_of_week"] = day_of_week
-    if shift is not None:
-        updates["shift"] = shift
-    if quantity is not None:
-        updates["quantity"] = quantity
-    if production_time is not None:
-        updates["production_time"] = production_time
-    if updates:
-        client.table("schedules").update(updates).eq("id", row_id).execute()
-        _clear_schedule_db_caches()
+def clear_pending_edits():
+    """보류 중인 수정/삭제 내역 초기화"""
+    st.session_state['pending_edits'] = {}
+    st.session_state['pending_deletes'] = set()
 
 def backup_schedule_to_session(week_start):
-    """수정 모드 진입 시 현재 스케줄을 session_state에 백업"""
-    result = supabase.table("schedules").select("*").eq(
-        "week_start", week_start.strftime('%Y-%m-%d')
-    ).order("id").execute()
-    if result.data:
-        st.session_state['schedule_backup'] = result.data
-    else:
-        st.session_state['schedule_backup'] = []
+    """수정 모드 진입 시 변경 기록(diff) 초기화
+    수정/삭제는 '수정 완료' 전까지 DB에 쓰지 않으므로, 수정 모드 중 DB에 바로 반영되는 추가 행 id만 기록
+    """
+    st.session_state['schedule_backup'] = {
+        'week_start': week_start.strftime('%Y-%m-%d'),
+        'inserted_ids': [],
+    }
+
+def record_schedule_insert(row_ids):
+    """수정 모드 중 추가된 행 id를 변경 기록에 추가 (취소 시 삭제 대상)"""
+    backup = st.session_state.get('schedule_backup')
+    if isinstance(backup, dict):
+        backup['inserted_ids'].extend(row_ids)
 
 def restore_schedule_from_session(week_start):
-    """취소 시 백업 데이터로 DB 복원"""
-    client = get_supabase_client()
-    backup = st.session_state.get('schedule_backup', [])
-    if not backup:
+    """취소 시 변경 기록 기준으로 DB 복원 (수정 모드 중 추가된 행만 삭제)"""
+    backup = st.session_state.get('schedule_backup')
+    if not isinstance(backup, dict) or backup.get('week_start') != week_start.strftime('%Y-%m-%d'):
         return
-
-    # 현재 데이터 전체 삭제
-    client.table("schedules").delete().eq(
-        "week_start", week_start.strftime('%Y-%m-%d')
-    ).execute()
-
-    # 백업 데이터 재삽입 (id 제외 - DB에서 자동 생성)
-    rows_to_insert = []
-    for row in backup:
-        new_row = {k: v for k, v in row.items() if k != 'id'}
-        rows_to_insert.append(new_row)
-
-    if rows_to_insert:
-        # 배치 삽입 (1000건씩)
-        for i in range(0, len(rows_to_insert), 1000):
-            batch = rows_to_insert[i:i+1000]
-            client.table("schedules").insert(batch).execute()
-
-    _clear_schedule_db_caches()
-    st.session_state['schedule_backup'] = []
+    inserted_ids = backup['inserted_ids']
+    if inserted_ids:
+        client = get_supabase_client()
+        client.table("schedules").delete().in_("id", inserted_ids).execute()
+        _clear_schedule_db_caches()
+    st.session_state['schedule_backup'] = {}
 
 @st.cache_data(ttl=300)
-def get_all_weeks():
-    """주차 목록 조회 (캐시 5분)"""
-    result = supabase.table("schedules").select(
-        "week_start, week_end"
-    ).order("week_start", desc=True).execute()
-    if result.data:
-        seen = set()
-        weeks = []
-        for row in result.data:
+def get_all_weeks(limit=None, offset=0):
+    """주차 목록 조회 (캐시 5분). 최신 주차부터 offset 이후 limit개 반환 (limit=None이면 전체)
+    행을 WEEK_FETCH_CHUNK 단위로 가져오다가 필요한 주차 수가 채워지면 중단
+    """
+    needed = None if limit is None else offset + limit
+    seen = set()
+    weeks = []
+    start = 0
+    while True:
+        result = supabase.table("schedules").select(
+            "week_start, week_end"
+        ).order("week_start", desc=True).range(start, start + WEEK_FETCH_CHUNK - 1).execute()
+        rows = result.data or []
+        for row in rows:
             key = (row["week_start"], row["week_end"])
             if key not in seen:
                 seen.add(key)
                 weeks.append(key)
-        return weeks
-    return []
+        # 마지막 주차가 다음 청크로 이어질 수 있으므로 needed보다 많이 모였을 때만 중단
+        if len(rows) < WEEK_FETCH_CHUNK or (needed is not None and len(weeks) > needed):
+            break
+        start += WEEK_FETCH_CHUNK
+    if limit is None:
+        return weeks[offset:]
+    return weeks[offset:offset + limit]
+
+@st.cache_data(ttl=300)
+def get_week_options(limit=None):
+    """주차 선택 목록 (캐시 5분). 반환: (표시 라벨 목록, {표시 라벨: 주 시작일 datetime})
+    시작일은 여기서 한 번만 파싱해 두어 선택 시에는 조회만 수행
+    """
+    weeks = get_all_weeks(limit=limit)
+    labels = [f"{start} ~ {end}" for start, end in weeks]
+    return labels, dict(zip(labels, (datetime.fromisoformat(start) for start, _ in weeks)))
+
+# ========================
+# 통계 집계
+# ========================
+
+def _category_sum(cat_col, values):
+    """범주형 컬럼의 범주별 values 합계 (해시 groupby 대신 범주 코드 기준 선형 집계)
+    코드가 이미 정렬돼 있으면 구간 경계만 찾아 np.add.reduceat, 아니면 np.bincount 1회
+    """
+    codes = cat_col.cat.codes.to_numpy()
+    weights = values.to_numpy()
+    is_int = np.issubdtype(weights.dtype, np.integer)
+    n_cats = len(cat_col.cat.categories)
+    if len(codes) and codes[0] >= 0 and np.all(codes[1:] >= codes[:-1]):
+        # 정렬된 입력: 코드가 바뀌는 위치가 곧 그룹 경계 (축소된 정수형 오버플로 방지를 위해 64비트로 누적)
+        run_starts = np.concatenate(([0], np.flatnonzero(np.diff(codes)) + 1))
+        sums = np.zeros(n_cats, dtype=np.int64 if is_int else np.float64)
+        sums[codes[run_starts]] = np.add.reduceat(weights.astype(sums.dtype, copy=False), run_starts)
+    else:
+        valid = codes >= 0  # 결측(코드 -1) 제외
+        sums = np.bincount(codes[valid], weights=weights[valid], minlength=n_cats)
+        if is_int:
+            sums = sums.round().astype(np.int64)  # 축소된 정수형이어도 합계는 int64로
+    return pd.Series(sums, index=pd.Index(cat_col.cat.categories, name=cat_col.name), name=values.name)
+
+def _top_k_positions(sums, k):
+    """sums에서 큰 값 k개의 위치를 내림차순으로 반환 (부분 정렬, 동률은 앞선 위치 우선 = nlargest(keep='first'))"""
+    if len(sums) <= k:
+        idx = np.arange(len(sums))
+    else:
+        kth = np.partition(sums, len(sums) - k)[len(sums) - k]
+        above = np.flatnonzero(sums > kth)
+        ties = np.flatnonzero(sums == kth)[:k - len(above)]
+        idx = np.concatenate((above, ties))
+    return idx[np.lexsort((idx, -sums[idx]))]
+
+@st.cache_data(ttl=300, show_spinner=False)
+def compute_week_aggregates(week_start_str):
+    """주차별 통계 집계 (캐시 5분). 스케줄이 없으면 None
+    반환: {'daily', 'shift', 'top10': 라벨 인덱스의 수량 Series, 'summary': 요약 지표 dict}
+    """
+    # 집계에 쓰는 컬럼만 조회 (reason 등 긴 텍스트는 전송하지 않음), 요일 순 정렬로 구간 합계 경로 사용
+    df = load_schedule_from_db(week_start_str, columns=STATS_COLUMNS, order_by="day_of_week")
+    if df.empty:
+        return None
+
+    # 저카디널리티 문자열 컬럼은 범주형으로 변환 → groupby가 정수 코드로 동작
+    # 요일 라벨('10/13 (월)')은 DAYS 순서로 범주 정렬 (연말 주차도 월~금 순서 유지)
+    day_labels = pd.Series(pd.unique(df['day_of_week']))
+    day_rank = get_day_keys(day_labels).map({d: i for i, d in enumerate(DAYS)}).fillna(len(DAYS))
+    day_order = [label for _, label in sorted(zip(day_rank, day_labels))]
+    df['day_of_week'] = pd.Categorical(df['day_of_week'], categories=day_order, ordered=True)
+    df['shift'] = df['shift'].astype('category')
+    # 제품명은 카디널리티가 높고 한 번만 그룹핑하므로 Arrow 문자열 사용 (pyarrow 없으면 범주형)
+    try:
+        df['product'] = df['product'].astype('string[pyarrow]')
+    except ImportError:
+        df['product'] = df['product'].astype('category')
+    # 정수 컬럼은 값 범위에 맞는 가장 작은 정수형으로 축소 (합계·평균은 64비트로 누적)
+    # production_time은 float32 합계 오차가 소수 첫째 자리 표시에 영향을 줄 수 있어 float64 유지
+    for col in ('quantity', 'urgency'):
+        df[col] = pd.to_numeric(df[col], downcast='integer')
+
+    # 요약 지표: 수치 3컬럼을 한 블록으로 꺼내 열 방향 합계 1회 (긴급도 평균은 합계/개수)
+    values = df[['quantity', 'production_time', 'urgency']].to_numpy(dtype=np.float64)
+    totals = np.nansum(values, axis=0)
+    urgency_count = np.count_nonzero(~np.isnan(values[:, 2]))
+    # 제품별 합계: factorize(해시 1회) + bincount, TOP 10은 전체 정렬 없이 부분 선택
+    product_codes, products = pd.factorize(df['product'], use_na_sentinel=False)
+    product_sums = np.bincount(product_codes, weights=df['quantity'].to_numpy(dtype=np.float64, na_value=0)).round().astype(np.int64)
+    top_idx = _top_k_positions(product_sums, 10)
+    return {
+        # 요일은 범주 순서(월~금) 그대로 출력
+        # 요일·교대는 모든 범주가 관측값에서 만들어지므로 bincount 결과가 observed 집계와 동일
+        'daily': _category_sum(df['day_of_week'], df['quantity']),
+        'shift': _category_sum(df['shift'], df['quantity']),
+        'top10': pd.Series(product_sums[top_idx], index=pd.Index(products[top_idx], name='product'), name='quantity'),
+        'summary': {
+            'total_qty': int(totals[0]),
+            'total_time': float(totals[1]),
+            'n_products': int(pd.notna(products).sum()),
+            'avg_urgency': float(totals[2] / urgency_count) if urgency_count else float('nan'),
+        },
+    }
+
+# 통계 차트: plotly express 대신 집계 결과 배열로 graph_objects를 직접 구성
+# (plotly는 통계 화면에서만 쓰이므로 차트 생성 시점에 import)
+SHIFT_COLORS = {'주간': '#1f77b4', '야간': '#ff7f0e'}
+
+def _build_daily_fig(daily):
+    """요일별 총 생산량 막대 차트 (daily: 요일 라벨 인덱스의 수량 Series)"""
+    import plotly.graph_objects as go
+
+    qty = daily.to_numpy()
+    fig = go.Figure(go.Bar(
+        x=daily.index.astype(str).to_numpy(), y=qty,
+        marker=dict(color=qty, colorscale='Blues', showscale=True, colorbar=dict(title='생산량(개)')),
+        hovertemplate='요일=%{x}<br>생산량(개)=%{y}<extra></extra>',
+    ))
+    fig.update_layout(title='요일별 총 생산량', xaxis_title='요일', yaxis_title='생산량(개)')
+    return fig
+
+def _build_shift_fig(shift):
+    """주간/야간 생산 비율 파이 차트 (shift: 교대 인덱스의 수량 Series)"""
+    import plotly.graph_objects as go
+
+    labels = shift.index.astype(str).to_numpy()
+    fig = go.Figure(go.Pie(
+        labels=labels, values=shift.to_numpy(),
+        marker=dict(colors=[SHIFT_COLORS.get(label) for label in labels]),
+        hovertemplate='shift=%{label}<br>quantity=%{value}<extra></extra>',
+    ))
+    fig.update_layout(title='주간/야간 생산 비율')
+    return fig
+
+def _build_top10_fig(top10):
+    """제품별 생산량 TOP 10 가로 막대 차트 (top10: 제품 인덱스의 수량 Series)"""
+    import plotly.graph_objects as go
+
+    qty = top10.to_numpy()
+    fig = go.Figure(go.Bar(
+        x=qty, y=top10.index.astype(str).to_numpy(), orientation='h',
+        marker=dict(color=qty, colorscale='Greens', showscale=True, colorbar=dict(title='생산량(개)')),
+        hovertemplate='생산량(개)=%{x}<br>제품=%{y}<extra></extra>',
+    ))
+    fig.update_layout(title='제품별 생산량 TOP 10', xaxis_title='생산량(개)', yaxis_title='제품')
+    return fig
+
+@st.cache_resource(max_entries=20, show_spinner=False)
+def _build_stats_figures(sig, _aggs):
+    """통계 차트 3종 구성 (서명 기준으로 세션 간 공유, _aggs는 해시 대상 제외)"""
+    # 세 차트는 서로 독립적이므로 병렬로 구성
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [
+            executor.submit(_build_daily_fig, _aggs['daily']),
+            executor.submit(_build_shift_fig, _aggs['shift']),
+            executor.submit(_build_top10_fig, _aggs['top10']),
+        ]
+        return tuple(f.result() for f in futures)
+
+def get_stats_figures(week_start_str, aggs):
+    """통계 차트 3종 (집계 결과 서명 기준 세션 간 공유 캐시 재사용, 바뀐 경우에만 재구성)"""
+    sig = repr((week_start_str, tuple(aggs['summary'].values())) + tuple(
+        tuple(zip(aggs[key].index.astype(str), aggs[key].tolist())) for key in ('daily', 'shift', 'top10')
+    ))
+    return _build_stats_figures(sig, aggs)
+
+# ========================
+# 엑셀 내보내기
+# ========================
+
+@st.cache_data(ttl=300, max_entries=20)
+def build_schedule_xlsx(df, sheet_name='생산스케줄'):
+    """스케줄 DataFrame을 xlsx 바이트로 변환 (df 내용 해시 기준 캐시 5분)
+    xlsxwriter constant_memory 모드로 행 단위 스트리밍 기록
+    """
+    import xlsxwriter
+
+    buf = BytesIO()
+    workbook = xlsxwriter.Workbook(buf, {'constant_memory': True})
+    worksheet = workbook.add_worksheet(sheet_name)
+    header_fmt = workbook.add_format({'bold': True, 'border': 1})
+
+    # constant_memory 모드는 행 순서대로만 기록 가능 → 헤더 후 행 단위로 기록
+    worksheet.write_row(0, 0, [str(c) for c in df.columns], header_fmt)
+    values = df.astype(object).where(df.notna(), None)
+    for row_idx, row in enumerate(values.itertuples(index=False, name=None), start=1):
+        worksheet.write_row(row_idx, 0, row)
+
+    workbook.close()
+    return buf.getvalue()
+
+def schedule_render_sig(file_stem, df):
+    """다운로드 산출물 재사용 판단용 서명 (파일명 stem + 행 수 + 데이터 내용 해시)"""
+    content_hash = int(pd.util.hash_pandas_object(df, index=False).sum())
+    return hashlib.blake2b(f"{file_stem}|{df.shape[0]}|{content_hash}".encode(), digest_size=16).hexdigest()
 
 # ========================
 # 스케줄 스크린샷 생성 (Pillow)
 # ========================
 
+IS_WINDOWS = os.name == "nt"
+FONT_DIR = os.path.join(os.path.dirname(__file__), "fonts")
+
+# 한글 폰트 후보 경로 (우선순위 순)
+KOREAN_FONT_CANDIDATES = [
+    # 프로젝트 내 폰트 (최우선)
+    os.path.join(FONT_DIR, "NanumGothic.ttf"),
+    os.path.join(os.path.dirname(__file__), "NanumGothic.ttf"),
+    # Windows
+    "C:/Windows/Fonts/malgun.ttf",
+    "C:/Windows/Fonts/malgunbd.ttf",
+    "C:/Windows/Fonts/NanumGothic.ttf",
+    "C:/Windows/Fonts/gulim.ttc",
+    # Linux (apt: fonts-nanum)
+    "/usr/share/fonts/truetype/nanum/NanumGothic.ttf",
+    "/usr/share/fonts/truetype/nanum/NanumGothicBold.ttf",
+    "/usr/share/fonts/nanum/NanumGothic.ttf",
+    "/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/unfonts-core/UnDotum.ttf",
+    # macOS
+    "/System/Library/Fonts/AppleSDGothicNeo.ttc",
+    "/Library/Fonts/NanumGothic.ttf",
+]
+
+KOREAN_BOLD_FONT_CANDIDATES = [
+    os.path.join(FONT_DIR, "NanumGothicBold.ttf"),
+    "C:/Windows/Fonts/malgunbd.ttf",
+    "C:/Windows/Fonts/NanumGothicBold.ttf",
+    "/usr/share/fonts/truetype/nanum/NanumGothicBold.ttf",
+    "/usr/share/fonts/nanum/NanumGothicBold.ttf",
+]
+
 def get_korean_font_path():
     """시스템에서 한글 폰트 경로 찾기, 없으면 자동 다운로드"""
-    candidates = [
-        # 프로젝트 내 폰트 (최우선)
-        os.path.join(os.path.dirname(__file__), "fonts", "NanumGothic.ttf"),
-        os.path.join(os.path.dirname(__file__), "NanumGothic.ttf"),
-        # Windows
-        "C:/Windows/Fonts/malgun.ttf",
-        "C:/Windows/Fonts/malgunbd.ttf",
-        "C:/Windows/Fonts/NanumGothic.ttf",
-        "C:/Windows/Fonts/gulim.ttc",
-        # Linux (apt: fonts-nanum)
-        "/usr/share/fonts/truetype/nanum/NanumGothic.ttf",
-        "/usr/share/fonts/truetype/nanum/NanumGothicBold.ttf",
-        "/usr/share/fonts/nanum/NanumGothic.ttf",
-        "/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc",
-        "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
-        "/usr/share/fonts/truetype/unfonts-core/UnDotum.ttf",
-        # macOS
-        "/System/Library/Fonts/AppleSDGothicNeo.ttc",
-        "/Library/Fonts/NanumGothic.ttf",
-    ]
-    for fp in candidates:
+    for fp in KOREAN_FONT_CANDIDATES:
         if os.path.exists(fp):
             return fp
     
     # 시스템에 한글 폰트가 없으면 자동 다운로드
     try:
         import urllib.request
-        font_dir = os.path.join(os.path.dirname(__file__), "fonts")
-        os.makedirs(font_dir, exist_ok=True)
-        font_path = os.path.join(font_dir, "NanumGothic.ttf")
+        os.makedirs(FONT_DIR, exist_ok=True)
+        font_path = os.path.join(FONT_DIR, "NanumGothic.ttf")
         if not os.path.exists(font_path):
             url = "https://github.com/googlefonts/nanum/raw/main/fonts/NanumGothic-Regular.ttf"
             urllib.request.urlretrieve(url, font_path)
@@ -878,43 +1095,103 @@ def get_korean_font_path():
 
 def get_korean_font_path_bold():
     """한글 Bold 폰트 경로 찾기"""
-    candidates = [
-        os.path.join(os.path.dirname(__file__), "fonts", "NanumGothicBold.ttf"),
-        "C:/Windows/Fonts/malgunbd.ttf",
-        "C:/Windows/Fonts/NanumGothicBold.ttf",
-        "/usr/share/fonts/truetype/nanum/NanumGothicBold.ttf",
-        "/usr/share/fonts/nanum/NanumGothicBold.ttf",
-    ]
-    for fp in candidates:
+    for fp in KOREAN_BOLD_FONT_CANDIDATES:
         if os.path.exists(fp):
             return fp
     return None
 
+@st.cache_resource
+def load_font_bytes(bold=False):
+    """한글 폰트 파일을 한 번만 읽어 메모리에 보관 (Bold 없으면 Regular로 대체)
+
+    찾지 못하면 FileNotFoundError를 발생시켜 캐시하지 않음 (다음 호출 때 탐색·다운로드 재시도)
+    """
+    paths = [get_korean_font_path_bold(), get_korean_font_path()] if bold else [get_korean_font_path()]
+    for fp in paths:
+        if not fp:
+            continue
+        try:
+            with open(fp, "rb") as f:
+                return f.read()
+        except OSError:
+            continue
+    raise FileNotFoundError("한글 폰트를 찾을 수 없습니다.")
+
+def has_korean_font():
+    """한글 폰트 사용 가능 여부 (렌더링 결과 캐시 키 구분용)"""
+    try:
+        load_font_bytes()
+        return True
+    except FileNotFoundError:
+        return False
+
 def make_font(size, bold=False):
-    """폰트 객체 생성"""
-    if bold:
-        bold_path = get_korean_font_path_bold()
-        if bold_path:
-            try:
-                return ImageFont.truetype(bold_path, size)
-            except Exception:
-                pass
-    font_path = get_korean_font_path()
-    if font_path:
+    """폰트 객체 생성 (메모리에 캐시된 폰트 바이트에서 로드)"""
+    try:
+        font_bytes = load_font_bytes(bold)
+    except FileNotFoundError:
+        font_bytes = None
+    if font_bytes:
         try:
-            return ImageFont.truetype(font_path, size)
+            return ImageFont.truetype(BytesIO(font_bytes), size)
         except Exception:
             pass
-    try:
-        return ImageFont.truetype("arial.ttf", size)
-    except Exception:
-        return ImageFont.load_default()
+    # arial.ttf는 Windows에만 있으므로 그 외 OS에서는 시도하지 않음
+    if IS_WINDOWS:
+        try:
+            return ImageFont.truetype("arial.ttf", size)
+        except Exception:
+            pass
+    return ImageFont.load_default()
+
+@st.cache_resource
+def make_empty_placeholder(size, fill="#999999", korean_font=True):
+    """'생산 없음' 문구를 투명 RGBA 이미지로 한 번만 렌더링 (붙여넣기용)
+
+    korean_font: 한글 폰트 사용 가능 여부 - 대체 폰트로 그린 결과가 폰트 확보 후에도 재사용되지 않도록 캐시 키에 포함
+    """
+    font = make_font(size)
+    text = "생산 없음"
+    bbox = font.getbbox(text)
+    placeholder = Image.new("RGBA", (max(bbox[2], 1), max(bbox[3], 1)), (0, 0, 0, 0))
+    ImageDraw.Draw(placeholder).text((0, 0), text, fill=fill, font=font)
+    return placeholder
+
+def _make_schedule_palette(colors, ramps, steps=16, min_gap=6):
+    """스케줄 이미지용 고정 팔레트 이미지(P 모드) 생성 - Image.quantize(palette=)에 전달
+
+    colors: 그대로 보존할 테마 색상 목록
+    ramps: (글자색, 배경색) 쌍 목록 - 두 색 사이의 안티앨리어싱 중간색을 steps 단계로 채움
+    Pillow는 근사 색상 캐시로 매핑하므로, 테마 색상과 min_gap 이내로 가까운 중간색은 넣지 않음 (테마 색상이 바뀌지 않도록)
+    """
+    theme = []
+    for c in colors:
+        rgb = ImageColor.getrgb(c)
+        if rgb not in theme:
+            theme.append(rgb)
+    entries = list(theme)
+    for fg, bg in ramps:
+        fg_rgb, bg_rgb = ImageColor.getrgb(fg), ImageColor.getrgb(bg)
+        for i in range(1, steps + 1):
+            t = i / (steps + 1)
+            rgb = tuple(round(b + (f - b) * t) for f, b in zip(fg_rgb, bg_rgb))
+            if rgb not in entries and all(max(abs(v - w) for v, w in zip(rgb, c)) >= min_gap for c in theme):
+                entries.append(rgb)
+    palette = Image.new("P", (1, 1))
+    palette.putpalette([v for rgb in entries[:256] for v in rgb])
+    return palette
 
 def generate_schedule_image(df, selected_week, paper_size="A4"):
     """스케줄 데이터를 깔끔한 PNG 이미지로 생성 (Pillow)
 
     paper_size: "A3" (300 DPI, ~3500px) 또는 "A4" (300 DPI, ~2480px)
+    동일한 데이터·주차·용지 조합은 캐시된 PNG 바이트를 재사용
     """
+    return BytesIO(_render_schedule_png(df, selected_week, paper_size, has_korean_font()))
+
+@st.cache_data(ttl=300, max_entries=20)
+def _render_schedule_png(df, selected_week, paper_size, korean_font=True):
+    """스케줄 이미지를 렌더링해 PNG 바이트로 반환 (df 내용·한글 폰트 유무 기준 캐시 5분)"""
     # 용지별 스케일 팩터 (인쇄 시 300 DPI 확보)
     SCALE = {"A3": 3, "A4": 2}.get(paper_size, 2)
 
@@ -925,7 +1202,6 @@ def generate_schedule_image(df, selected_week, paper_size="A4"):
     font_day_header = make_font(int(20 * SCALE), bold=True)
     font_shift = make_font(int(16 * SCALE), bold=True)
     font_item = make_font(int(18 * SCALE))
-    font_empty = make_font(int(14 * SCALE))
 
     # 색상
     BG = "#FFFFFF"
@@ -941,32 +1217,56 @@ def generate_schedule_image(df, selected_week, paper_size="A4"):
     MUTED = "#999999"
     DIVIDER = "#DDDDDD"
 
+    # "생산 없음" 문구는 미리 렌더링된 이미지를 붙여넣기
+    empty_img = make_empty_placeholder(int(14 * SCALE), MUTED, korean_font)
+
     # 레이아웃 상수 (스케일 적용)
-    IMG_W = 1100 * SCALE
     PAD_X = 40 * SCALE
-    CONTENT_W = IMG_W - PAD_X * 2
-    COL_W = CONTENT_W // 2 - 10 * SCALE
     ITEM_H = 28 * SCALE
     DAY_HEADER_H = 44 * SCALE
     SHIFT_HEADER_H = 32 * SCALE
     BLOCK_PAD = 16 * SCALE
     
-    # 요일별 데이터 정리
+    # 항목 문구는 행 단위 f-string 대신 DataFrame 전체에 대해 한 번에 생성
+    df = df.assign(_label=(
+        df['product'].astype(str) + '  ' + df['quantity'].astype(str) + '개  ('
+        + df['production_time'].astype(str) + 'h)'
+    ))
+
+    # 요일별 데이터 정리 (요일 문자 추출 1회 + groupby 1회로 분할)
+    day_keys = get_day_keys(df['day_of_week'])
+    day_groups = dict(tuple(df.groupby(day_keys, sort=False)))
+    label_by_day = df['day_of_week'].groupby(day_keys, sort=False).first().to_dict()
     day_data_map = {}
     for day in DAYS:
-        day_matches = df[df['day_of_week'].str.contains(day)]
-        day_label = day_matches['day_of_week'].iloc[0] if len(day_matches) > 0 else f"({day})"
-        
-        day_items = []
-        for _, r in day_matches[day_matches['shift'] == '주간'].iterrows():
-            day_items.append(f"{r['product']}  {r['quantity']}개  ({r['production_time']}h)")
-        
-        night_items = []
-        for _, r in day_matches[day_matches['shift'] == '야간'].iterrows():
-            night_items.append(f"{r['product']}  {r['quantity']}개  ({r['production_time']}h)")
+        day_matches = day_groups.get(day, df.iloc[0:0])
+        day_label = label_by_day.get(day, f"({day})")
         
+        day_items = day_matches.loc[day_matches['shift'] == '주간', '_label'].tolist()
+        night_items = day_matches.loc[day_matches['shift'] == '야간', '_label'].tolist()
+
         day_data_map[day] = {'label': day_label, 'day': day_items, 'night': night_items}
-    
+
+    # 요약 문구 (이미지 너비 계산에도 사용)
+    total_qty = df['quantity'].sum()
+    total_time = df['production_time'].sum()
+    total_products = df['product'].nunique()
+    summary = f"총 생산량: {total_qty:,}개   |   총 시간: {total_time:.1f}h   |   제품: {total_products}종"
+
+    # 이미지 너비: 항목이 적은 주는 좁은 캔버스 사용 (가장 긴 항목·요약 문구는 들어가도록 보장)
+    base_w = (800 if len(df) < 20 else 1100) * SCALE
+    longest_item = max(
+        (font_item.getlength(f"• {item}") for d in day_data_map.values() for item in d['day'] + d['night']),
+        default=0
+    )
+    need_w = max(
+        2 * (int(longest_item) + 32 * SCALE) + 20 * SCALE + PAD_X * 2,
+        int(font_summary.getlength(summary)) + 32 * SCALE + PAD_X * 2
+    )
+    IMG_W = min(max(base_w, need_w), 1100 * SCALE)
+    CONTENT_W = IMG_W - PAD_X * 2
+    COL_W = CONTENT_W // 2 - 10 * SCALE
+
     # 전체 높이 계산 (스케일 적용)
     total_h = (60 + 30 + 50 + 20) * SCALE  # title + week + summary + gap
     for day in DAYS:
@@ -994,10 +1294,6 @@ def generate_schedule_image(df, selected_week, paper_size="A4"):
     y += 32 * SCALE
     
     # 요약
-    total_qty = df['quantity'].sum()
-    total_time = df['production_time'].sum()
-    total_products = df['product'].nunique()
-    summary = f"총 생산량: {total_qty:,}개   |   총 시간: {total_time:.1f}h   |   제품: {total_products}종"
     bbox = draw.textbbox((0, 0), summary, font=font_summary)
     sw = bbox[2] - bbox[0]
     sh = bbox[3] - bbox[1]
@@ -1010,7 +1306,7 @@ def generate_schedule_image(df, selected_week, paper_size="A4"):
     draw.line([(PAD_X, y), (IMG_W - PAD_X, y)], fill=DIVIDER, width=SCALE)
     y += 16 * SCALE
     
-    # 각 요일
+    # 각 요일 (전체 캔버스에 직접 그림 - 열 너비를 넘는 긴 항목도 이미지 끝까지 표시)
     for day in DAYS:
         data = day_data_map[day]
         num_rows = max(len(data['day']), len(data['night']), 1)
@@ -1028,19 +1324,19 @@ def generate_schedule_image(df, selected_week, paper_size="A4"):
 
         block_h = SHIFT_HEADER_H + num_rows * ITEM_H + BLOCK_PAD
 
-        # 주간 배경
+        # 주간 배경 (직사각형: 둥근 모서리 마스크 합성 생략)
         left_x = PAD_X
-        draw.rounded_rectangle(
+        draw.rectangle(
             [left_x, y, left_x + COL_W, y + block_h],
-            radius=6 * SCALE, fill=DAY_BG, outline=DAY_BORDER
+            fill=DAY_BG, outline=DAY_BORDER
         )
         draw.text((left_x + 12 * SCALE, y + 6 * SCALE), "[주간]", fill="#B8860B", font=font_shift)
 
         # 야간 배경
         right_x = PAD_X + COL_W + 20 * SCALE
-        draw.rounded_rectangle(
+        draw.rectangle(
             [right_x, y, right_x + COL_W, y + block_h],
-            radius=6 * SCALE, fill=NIGHT_BG, outline=NIGHT_BORDER
+            fill=NIGHT_BG, outline=NIGHT_BORDER
         )
         draw.text((right_x + 12 * SCALE, y + 6 * SCALE), "[야간]", fill="#4A5080", font=font_shift)
 
@@ -1051,22 +1347,31 @@ def generate_schedule_image(df, selected_week, paper_size="A4"):
             for i, item in enumerate(data['day']):
                 draw.text((left_x + 16 * SCALE, item_y + i * ITEM_H), f"• {item}", fill=TEXT_COLOR, font=font_item)
         else:
-            draw.text((left_x + COL_W // 2 - 30 * SCALE, item_y + (num_rows * ITEM_H) // 2 - 10 * SCALE), "생산 없음", fill=MUTED, font=font_empty)
+            img.paste(empty_img, (left_x + COL_W // 2 - 30 * SCALE, item_y + (num_rows * ITEM_H) // 2 - 10 * SCALE), empty_img)
 
         # 야간 항목
         if data['night']:
             for i, item in enumerate(data['night']):
                 draw.text((right_x + 16 * SCALE, item_y + i * ITEM_H), f"• {item}", fill=TEXT_COLOR, font=font_item)
         else:
-            draw.text((right_x + COL_W // 2 - 30 * SCALE, item_y + (num_rows * ITEM_H) // 2 - 10 * SCALE), "생산 없음", fill=MUTED, font=font_empty)
+            img.paste(empty_img, (right_x + COL_W // 2 - 30 * SCALE, item_y + (num_rows * ITEM_H) // 2 - 10 * SCALE), empty_img)
 
         y += block_h + 12 * SCALE
-    
+
+    # 사용 색상이 정해져 있으므로 테마 색상 + 글자 안티앨리어싱 단계로 만든 고정 팔레트로 8비트 변환 후 저장
+    palette = _make_schedule_palette(
+        [BG, HEADER_BG, HEADER_TEXT, DAY_BG, DAY_BORDER, NIGHT_BG, NIGHT_BORDER,
+         SUMMARY_BG, SUMMARY_BORDER, TEXT_COLOR, MUTED, DIVIDER, "#555555", "#B8860B", "#4A5080"],
+        [(TEXT_COLOR, BG), (TEXT_COLOR, SUMMARY_BG), (TEXT_COLOR, DAY_BG), (TEXT_COLOR, NIGHT_BG),
+         ("#555555", BG), (HEADER_TEXT, HEADER_BG), ("#B8860B", DAY_BG), ("#4A5080", NIGHT_BG),
+         (MUTED, DAY_BG), (MUTED, NIGHT_BG)],
+    )
+    img = img.quantize(palette=palette, dither=Image.Dither.NONE)
+
     # PNG로 저장 (300 DPI 메타데이터 포함)
     buf = BytesIO()
     img.save(buf, format="PNG", dpi=(300, 300))
-    buf.seek(0)
-    return buf
+    return buf.getvalue()
 
 # ========================
 # 메인 앱
@@ -1186,7 +1491,8 @@ if menu == "📅 새 스케줄 생성":
                         if st.button("🚀 스케줄 생성", type="primary", key="create_schedule"):
                             with st.spinner("스케줄 생성 중..."):
                                 try:
-                                    if check_schedule_exists(schedule_monday):
+                                    # 화면 경고에 쓴 캐시 값 대신 DB를 직접 다시 조회 (다른 세션이 그 사이 저장·삭제했을 수 있음)
+                                    if check_schedule_exists(schedule_monday, fresh=True):
                                         delete_schedule(schedule_monday)
                                         st.success("✅ 기존 스케줄 삭제 완료")
 
@@ -1196,49 +1502,33 @@ if menu == "📅 새 스케줄 생성":
                                     st.success(f"✅ 스케줄 생성 완료! ({date_labels['월']} ~ {date_labels['금']})")
                                     st.session_state['confirm_delete'] = False
 
+                                    # 교대별 표 행을 한 번에 구성 (list-of-dict 그대로 st.dataframe에 전달)
+                                    shift_rows = {}
+                                    for day in DAYS:
+                                        for shift in ('주간', '야간'):
+                                            rows = []
+                                            for i, (p, info) in enumerate(schedule[day][shift].items(), 1):
+                                                rows.append({
+                                                    '순서': i, '제품': p,
+                                                    '수량': f"{info['qty']}개",
+                                                    '시간': f"{info['hours']}h" if info['hours'] > 0 else "-",
+                                                    '이유': info['reason']
+                                                })
+                                            shift_rows[(day, shift)] = rows
+
                                     for day in DAYS:
                                         st.subheader(f"▶ {date_labels[day]}")
-                                        col1, col2 = st.columns(2)
-
-                                        with col1:
-                                            st.markdown("**🌞 주간**")
-                                            if schedule[day]['주간']:
-                                                data = []
-                                                for i, (p, info) in enumerate(schedule[day]['주간'].items(), 1):
-                                                    sec_val = info.get('sec', 0)
-                                                    time_h = round(info['qty'] * sec_val / 3600, 1) if sec_val > 0 else 0
-                                                    data.append({
-                                                        '순서': i, '제품': p,
-                                                        '수량': f"{info['qty']}개",
-                                                        '시간': f"{time_h}h" if time_h > 0 else "-",
-                                                        '이유': info['reason']
-                                                    })
-                                                st.dataframe(pd.DataFrame(data), use_container_width=True, hide_index=True)
-                                                total_time_h = round(daily_time[day]['주간'] / 3600, 1)
-                                                dl = get_shift_limit(day, '주간')
-                                                st.caption(f"생산량: {daily_sum[day]['주간']}/{dl}개 | 소요시간: {total_time_h}h")
-                                            else:
-                                                st.info("생산 없음")
-
-                                        with col2:
-                                            st.markdown("**🌙 야간**")
-                                            if schedule[day]['야간']:
-                                                data = []
-                                                for i, (p, info) in enumerate(schedule[day]['야간'].items(), 1):
-                                                    sec_val = info.get('sec', 0)
-                                                    time_h = round(info['qty'] * sec_val / 3600, 1) if sec_val > 0 else 0
-                                                    data.append({
-                                                        '순서': i, '제품': p,
-                                                        '수량': f"{info['qty']}개",
-                                                        '시간': f"{time_h}h" if time_h > 0 else "-",
-                                                        '이유': info['reason']
-                                                    })
-                                                st.dataframe(pd.DataFrame(data), use_container_width=True, hide_index=True)
-                                                total_time_h = round(daily_time[day]['야간'] / 3600, 1)
-                                                dl = get_shift_limit(day, '야간')
-                                                st.caption(f"생산량: {daily_sum[day]['야간']}/{dl}개 | 소요시간: {total_time_h}h")
-                                            else:
-                                                st.info("생산 없음")
+                                        for col, shift, header in zip(st.columns(2), ('주간', '야간'), ("**🌞 주간**", "**🌙 야간**")):
+                                            with col:
+                                                st.markdown(header)
+                                                rows = shift_rows[(day, shift)]
+                                                if rows:
+                                                    st.dataframe(rows, use_container_width=True, hide_index=True)
+                                                    total_time_h = round(daily_time[day][shift] / 3600, 1)
+                                                    dl = get_shift_limit(day, shift)
+                                                    st.caption(f"생산량: {daily_sum[day][shift]}/{dl}개 | 소요시간: {total_time_h}h")
+                                                else:
+                                                    st.info("생산 없음")
 
                                         st.divider()
 
@@ -1280,9 +1570,10 @@ elif menu == "✏️ 직접 생성":
 
         filtered_inv = inventory_df.copy()
         if search_query:
-            mask = filtered_inv.apply(
-                lambda row: match_chosung(search_query, str(row["제품"])) or search_query.upper() in str(row["제품코드"]).upper(),
-                axis=1
+            name_index = build_chosung_index(filtered_inv["제품"].tolist())
+            mask = (
+                search_chosung_index(name_index, search_query).to_numpy()
+                | filtered_inv["제품코드"].str.upper().str.contains(search_query.upper(), regex=False).to_numpy()
             )
             filtered_inv = filtered_inv[mask]
 
@@ -1301,12 +1592,12 @@ elif menu == "✏️ 직접 생성":
 
             manual_rows = []  # 수집된 입력 데이터
 
-            for _, inv_row in filtered_inv.iterrows():
-                p_code = str(inv_row["제품코드"]).strip()
-                p_name = str(inv_row["제품"]).strip()
+            for inv_row in filtered_inv.to_dict("records"):
+                p_code = inv_row["제품코드"]
+                p_name = inv_row["제품"]
                 min_qty = int(inv_row.get("최소생산수량", 0))
                 prod_time = int(inv_row.get("개당 생산시간(초)", 0))
-                timing = str(inv_row.get("생산시점", "주야")).strip()
+                timing = inv_row.get("생산시점", "주야")
                 if not timing:
                     timing = "주야"
 
@@ -1348,19 +1639,22 @@ elif menu == "✏️ 직접 생성":
             if manual_rows:
                 st.subheader("③ 미리보기")
 
-                existing_df = load_schedule_from_db(manual_monday.strftime('%Y-%m-%d'))
+                existing_df = load_schedule_from_db(
+                    manual_monday.strftime('%Y-%m-%d'),
+                    columns="day_of_week, shift, product, quantity, production_time",
+                )
 
-                existing_data = []
+                # 기존 행 라벨은 행 단위 반복 대신 컬럼 단위 문자열 결합으로 구성
+                existing_preview = pd.DataFrame()
                 if not existing_df.empty:
-                    for _, row in existing_df.iterrows():
-                        existing_data.append({
-                            "구분": "📌 기존",
-                            "날짜": row["day_of_week"],
-                            "교대": row["shift"],
-                            "제품": row["product"],
-                            "수량": f"{row['quantity']}개",
-                            "소요시간": f"{row['production_time']}h",
-                        })
+                    existing_preview = pd.DataFrame({
+                        "구분": "📌 기존",
+                        "날짜": existing_df["day_of_week"],
+                        "교대": existing_df["shift"],
+                        "제품": existing_df["product"],
+                        "수량": existing_df["quantity"].astype(str) + "개",
+                        "소요시간": existing_df["production_time"].astype(str) + "h",
+                    })
 
                 new_data = []
                 for mr in manual_rows:
@@ -1374,11 +1668,10 @@ elif menu == "✏️ 직접 생성":
                             "소요시간": f"{mr['production_time']}h",
                         })
 
-                combined = existing_data + new_data
-                combined_df = pd.DataFrame(combined)
+                combined_df = pd.concat([existing_preview, pd.DataFrame(new_data)], ignore_index=True)
 
-                if existing_data:
-                    st.caption(f"📌 기존 스케줄 {len(existing_data)}건 + 🆕 새로 추가 {len(new_data)}건")
+                if not existing_preview.empty:
+                    st.caption(f"📌 기존 스케줄 {len(existing_preview)}건 + 🆕 새로 추가 {len(new_data)}건")
                 else:
                     st.caption(f"🆕 새로 추가 {len(new_data)}건")
                 st.dataframe(combined_df, use_container_width=True, hide_index=True)
@@ -1422,34 +1715,54 @@ elif menu == "✏️ 직접 생성":
 elif menu == "🔍 스케줄 조회":
     st.header("저장된 스케줄 조회")
 
-    weeks = get_all_weeks()
+    # 최근 주차부터 WEEK_PAGE_SIZE개씩 표시 ("더 보기"로 확장), 한 개 더 조회해 추가 주차 존재 여부 판단
+    week_limit = st.session_state.get('week_limit', WEEK_PAGE_SIZE)
+    week_labels, week_map = get_week_options(limit=week_limit + 1)
+    has_more_weeks = len(week_labels) > week_limit
+    week_labels = week_labels[:week_limit]
 
-    if not weeks:
+    if not week_labels:
         st.info("저장된 스케줄이 없습니다. 먼저 스케줄을 생성해주세요.")
     else:
-        week_options = [f"{w[0]} ~ {w[1]}" for w in weeks]
-        selected_week = st.selectbox("주차 선택", week_options)
+        col_week_sel, col_week_more = st.columns([6, 1])
+        with col_week_sel:
+            selected_week = st.selectbox("주차 선택", week_labels)
+        with col_week_more:
+            if has_more_weeks:
+                st.markdown("<div style='height: 1.7rem'></div>", unsafe_allow_html=True)
+                if st.button("더 보기", key="btn_more_weeks", help=f"이전 주차 {WEEK_PAGE_SIZE}개를 더 불러옵니다"):
+                    st.session_state['week_limit'] = week_limit + WEEK_PAGE_SIZE
+                    st.rerun()
 
         if selected_week:
-            week_start = datetime.strptime(weeks[week_options.index(selected_week)][0], '%Y-%m-%d')
+            week_start = week_map[selected_week]
             week_start_str = week_start.strftime('%Y-%m-%d')
+            file_stem = f"생산스케줄_{week_start.strftime('%Y%m%d')}"
             df = load_schedule_from_db(week_start_str)
 
             if not df.empty:
                 # 수정 모드 토글 (주차별로 저장, 주차 변경 시 초기화)
                 is_edit_mode = can_edit("schedule") and st.session_state.get('schedule_edit_week') == selected_week and st.session_state.get('schedule_edit_mode', False)
 
-                # ── 요일별 데이터 사전 인덱싱 (한 번만 수행)
+                # 수정 모드: 편집기에서 변경했지만 아직 DB에 반영하지 않은 수정/삭제 내역
+                pending_edits = st.session_state.get('pending_edits', {})
+                pending_deletes = st.session_state.get('pending_deletes', set())
+
+                # ── 요일별 데이터 사전 인덱싱 (요일 문자 추출 + groupby 한 번으로 분할)
+                day_keys = get_day_keys(df['day_of_week'])
+                day_groups = dict(tuple(df.groupby(day_keys, sort=False)))
+                label_by_day = df['day_of_week'].groupby(day_keys, sort=False).first().to_dict()
                 day_data_map = {}
-                for day in DAYS:
-                    day_df = df[df['day_of_week'].str.contains(day)]
-                    day_label = day_df['day_of_week'].iloc[0] if len(day_df) > 0 else f"({day})"
+                for i, day in enumerate(DAYS):
+                    day_df = day_groups.get(day, df.iloc[0:0])
+                    # 생산 없는 요일도 날짜가 포함된 라벨 사용 (요일 선택 목록에서 '(수)'처럼 날짜 없는 값이 저장되지 않도록)
+                    day_label = label_by_day.get(day) or f"{(week_start + timedelta(days=i)).strftime('%m/%d')} ({day})"
                     day_data_map[day] = {
                         'label': day_label,
                         'df': day_df,
-                        'day_shift': day_df[day_df['shift'] == '주간'] if not day_df.empty else pd.DataFrame(),
-                        'night_shift': day_df[day_df['shift'] == '야간'] if not day_df.empty else pd.DataFrame(),
+                        'shifts': dict(tuple(day_df.groupby('shift', sort=False))),
                     }
+                # 요일 선택 목록: 한 번만 구성해 제품 추가·편집기에서 공유 (DAYS 순서 고정)
                 day_labels_list = [day_data_map[d]['label'] for d in DAYS]
 
                 # 상단 버튼 배치: 수정/완료/취소(왼쪽) + 다운로드(오른쪽)
@@ -1462,21 +1775,30 @@ elif menu == "🔍 스케줄 조회":
                         if not is_edit_mode:
                             if st.button("✏️ 수정", key="btn_edit_schedule"):
                                 backup_schedule_to_session(week_start)
+                                clear_pending_edits()
                                 st.session_state['schedule_edit_mode'] = True
                                 st.session_state['schedule_edit_week'] = selected_week
                                 st.rerun()
                         else:
+                            pending_count = len(set(pending_edits) | set(pending_deletes))
                             if st.button("✔️ 수정 완료", key="btn_done_edit"):
-                                st.session_state['schedule_edit_mode'] = False
-                                st.session_state['schedule_edit_week'] = None
-                                st.session_state['add_product_expanded'] = False
-                                st.session_state['schedule_backup'] = []
-                                st.rerun()
+                                try:
+                                    if pending_count:
+                                        apply_schedule_edits(week_start_str, pending_edits, pending_deletes)
+                                    clear_pending_edits()
+                                    st.session_state['schedule_edit_mode'] = False
+                                    st.session_state['schedule_edit_week'] = None
+                                    st.session_state['add_product_expanded'] = False
+                                    st.session_state['schedule_backup'] = {}
+                                    st.rerun()
+                                except Exception as e:
+                                    st.error(f"❌ 저장 실패: {str(e)}")
                     with col_cancel_btn:
                         if is_edit_mode:
                             if st.button("↩️ 취소", key="btn_cancel_edit"):
                                 try:
                                     restore_schedule_from_session(week_start)
+                                    clear_pending_edits()
                                     st.session_state['schedule_edit_mode'] = False
                                     st.session_state['schedule_edit_week'] = None
                                     st.session_state['add_product_expanded'] = False
@@ -1488,18 +1810,18 @@ elif menu == "🔍 스케줄 조회":
                         if is_edit_mode and st.button("🗑️ 주 전체 삭제", type="secondary", key="btn_del_week_top"):
                             st.session_state['confirm_delete_schedule'] = selected_week
                             st.rerun()
+                # 다운로드 산출물: 데이터 서명이 바뀐 경우에만 재생성, 위젯 조작만으로 인한 rerun은 세션 보관본 재사용
+                render_sig = schedule_render_sig(file_stem, df)
+                if st.session_state.get('_last_sig') != render_sig:
+                    st.session_state['_last_sig'] = render_sig
+                    st.session_state['_dl_cache'] = {'excel': build_schedule_xlsx(df), 'image': {}}
+                dl_cache = st.session_state['_dl_cache']
+
                 with col_dl_excel:
-                    # 엑셀: 세션에 캐시하여 매 렌더 시 재생성 방지
-                    excel_cache_key = f"_excel_cache_{week_start_str}"
-                    if excel_cache_key not in st.session_state:
-                        output = BytesIO()
-                        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                            df.to_excel(writer, index=False, sheet_name='생산스케줄')
-                        st.session_state[excel_cache_key] = output.getvalue()
                     st.download_button(
                         label="📥 엑셀 다운로드",
-                        data=st.session_state[excel_cache_key],
-                        file_name=f"생산스케줄_{selected_week.replace(' ~ ', '_')}.xlsx",
+                        data=dl_cache['excel'],
+                        file_name=f"{file_stem}.xlsx",
                         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                         key="download_excel"
                     )
@@ -1507,20 +1829,23 @@ elif menu == "🔍 스케줄 조회":
                     # 용지 크기 선택 및 고해상도 이미지 다운로드
                     paper_size = st.selectbox(
                         "용지 크기", ["A4", "A3"], key="paper_size_select",
-                        help="A3: 대형 인쇄용 (3300px), A4: 일반 인쇄용 (2200px)"
+                        help="A3: 대형 인쇄용 (최대 3300px), A4: 일반 인쇄용 (최대 2200px)"
                     )
-                    img_cache_key = f"_img_cache_{week_start_str}_{paper_size}"
-                    if img_cache_key not in st.session_state:
-                        try:
-                            img_buf = generate_schedule_image(df, selected_week, paper_size=paper_size)
-                            st.session_state[img_cache_key] = img_buf.getvalue()
-                        except Exception:
-                            st.session_state[img_cache_key] = None
-                    if st.session_state[img_cache_key] is not None:
+                    def _screenshot_bytes(paper_size=paper_size, image_cache=dl_cache['image']):
+                        """다운로드 클릭 시에만 이미지 생성 (같은 서명·용지 크기는 세션 보관본 재사용)"""
+                        if paper_size not in image_cache:
+                            try:
+                                image_cache[paper_size] = generate_schedule_image(df, selected_week, paper_size=paper_size).getvalue()
+                            except Exception:
+                                image_cache[paper_size] = None
+                                raise
+                        return image_cache[paper_size]
+
+                    if dl_cache['image'].get(paper_size, b"") is not None:
                         st.download_button(
                             label=f"📸 스크린샷 저장 ({paper_size})",
-                            data=st.session_state[img_cache_key],
-                            file_name=f"생산스케줄_{selected_week.replace(' ~ ', '_')}_{paper_size}.png",
+                            data=_screenshot_bytes,
+                            file_name=f"{file_stem}_{paper_size}.png",
                             mime="image/png",
                             key="download_screenshot"
                         )
@@ -1535,13 +1860,11 @@ elif menu == "🔍 스케줄 조회":
                         if st.button("✅ 삭제 확인", type="primary", key="confirm_del"):
                             try:
                                 delete_schedule(week_start)
+                                clear_pending_edits()
                                 st.success("✅ 스케줄이 삭제되었습니다.")
                                 st.session_state['confirm_delete_schedule'] = None
                                 st.session_state['schedule_edit_mode'] = False
                                 st.session_state['schedule_edit_week'] = None
-                                # 다운로드 캐시 제거
-                                st.session_state.pop(excel_cache_key, None)
-                                st.session_state.pop(img_cache_key, None)
                                 st.rerun()
                             except Exception as e:
                                 st.error(f"❌ 삭제 실패: {str(e)}")
@@ -1553,85 +1876,89 @@ elif menu == "🔍 스케줄 조회":
 
                 # ── 제품 추가 (수정 모드)
                 if is_edit_mode:
-                    with st.expander("➕ 제품 추가", expanded=False):
-
-                        # 제품 목록 로드
-                        all_product_names = load_all_product_names()
-
-                        # 초성 검색 필터
-                        search_query = st.text_input(
-                            "🔍 제품 검색 (제품명 또는 초성 입력)",
-                            key="add_prod_search",
-                            placeholder="예: 초코파이, ㅊㅋㅍㅇ, 파이 등"
-                        )
-
-                        if search_query.strip():
-                            filtered_products = [p for p in all_product_names if match_chosung(search_query.strip(), p)]
-                        else:
-                            filtered_products = all_product_names
-
-                        # 직접 입력 옵션 추가
-                        DIRECT_INPUT = "✏️ 직접 입력..."
-                        product_options = filtered_products + [DIRECT_INPUT]
-
-                        if not filtered_products and search_query.strip():
-                            st.caption(f"'{search_query}'에 해당하는 제품이 없습니다. 직접 입력을 선택하세요.")
-                            product_options = [DIRECT_INPUT]
-                        elif search_query.strip():
-                            st.caption(f"검색 결과: {len(filtered_products)}건")
-
-                        selected_product = st.selectbox(
-                            "제품 선택",
-                            options=product_options,
-                            key="add_prod_select",
-                            index=0
-                        )
-
-                        # 직접 입력 선택 시
-                        if selected_product == DIRECT_INPUT:
-                            add_product_name = st.text_input("제품명 직접 입력", key="add_prod_name_direct", placeholder="새 제품명을 입력하세요")
-                        else:
-                            add_product_name = selected_product
-
-                        add_col1, add_col2 = st.columns(2)
-                        with add_col1:
-                            add_quantity = st.number_input("수량 (개)", min_value=1, value=1, step=1, key="add_prod_qty")
-                            add_production_time = st.number_input("생산시간 (h)", min_value=0.0, value=0.0, step=0.1, format="%.1f", key="add_prod_time")
-                        with add_col2:
-                            add_day = st.selectbox("요일", day_labels_list, key="add_prod_day")
-                            add_shift = st.selectbox("교대", ["주간", "야간"], key="add_prod_shift")
-
-                        add_reason = st.text_input("이유", key="add_prod_reason", placeholder="예: 긴급 추가, 수동 추가 등")
-
-                        if st.button("✅ 제품 추가", key="btn_add_product", type="primary"):
-                            final_name = add_product_name.strip() if add_product_name else ""
-                            if not final_name or final_name == DIRECT_INPUT:
-                                st.error("제품명을 입력 또는 선택해주세요.")
+                    # 검색·선택 입력은 fragment 범위에서만 재실행 (추가 완료 시에만 전체 rerun)
+                    @st.fragment
+                    def _add_product_fragment():
+                        with st.expander("➕ 제품 추가", expanded=False):
+
+                            # 제품 목록 로드
+                            all_product_names = load_all_product_names()
+
+                            # 초성 검색 필터
+                            search_query = st.text_input(
+                                "🔍 제품 검색 (제품명 또는 초성 입력)",
+                                key="add_prod_search",
+                                placeholder="예: 초코파이, ㅊㅋㅍㅇ, 파이 등"
+                            )
+
+                            if search_query.strip():
+                                name_index = build_chosung_index(all_product_names)
+                                filtered_products = name_index.loc[search_chosung_index(name_index, search_query), "name"].tolist()
                             else:
-                                try:
-                                    week_end = week_start + timedelta(days=4)
-                                    new_row = {
-                                        "week_start": week_start_str,
-                                        "week_end": week_end.strftime('%Y-%m-%d'),
-                                        "day_of_week": add_day,
-                                        "shift": add_shift,
-                                        "product": final_name,
-                                        "quantity": int(add_quantity),
-                                        "production_time": round(float(add_production_time), 1),
-                                        "reason": add_reason.strip() if add_reason else "수동 추가",
-                                        "urgency": 0
-                                    }
-                                    client = get_supabase_client()
-                                    client.table("schedules").insert(new_row).execute()
-                                    _clear_schedule_db_caches()
-                                    load_all_product_names.clear()
-                                    # 다운로드 캐시 제거 (데이터 변경됨)
-                                    st.session_state.pop(excel_cache_key, None)
-                                    st.session_state.pop(img_cache_key, None)
-                                    st.success(f"✅ **{final_name}** {int(add_quantity)}개 → {add_day} {add_shift}에 추가되었습니다.")
-                                    st.rerun()
-                                except Exception as e:
-                                    st.error(f"❌ 추가 실패: {str(e)}")
+                                filtered_products = all_product_names
+
+                            # 직접 입력 옵션 추가
+                            DIRECT_INPUT = "✏️ 직접 입력..."
+                            product_options = filtered_products + [DIRECT_INPUT]
+
+                            if not filtered_products and search_query.strip():
+                                st.caption(f"'{search_query}'에 해당하는 제품이 없습니다. 직접 입력을 선택하세요.")
+                                product_options = [DIRECT_INPUT]
+                            elif search_query.strip():
+                                st.caption(f"검색 결과: {len(filtered_products)}건")
+
+                            selected_product = st.selectbox(
+                                "제품 선택",
+                                options=product_options,
+                                key="add_prod_select",
+                                index=0
+                            )
+
+                            # 직접 입력 선택 시
+                            if selected_product == DIRECT_INPUT:
+                                add_product_name = st.text_input("제품명 직접 입력", key="add_prod_name_direct", placeholder="새 제품명을 입력하세요")
+                            else:
+                                add_product_name = selected_product
+
+                            add_col1, add_col2 = st.columns(2)
+                            with add_col1:
+                                add_quantity = st.number_input("수량 (개)", min_value=1, value=1, step=1, key="add_prod_qty")
+                                add_production_time = st.number_input("생산시간 (h)", min_value=0.0, value=0.0, step=0.1, format="%.1f", key="add_prod_time")
+                            with add_col2:
+                                add_day = st.selectbox("요일", day_labels_list, key="add_prod_day")
+                                add_shift = st.selectbox("교대", ["주간", "야간"], key="add_prod_shift")
+
+                            add_reason = st.text_input("이유", key="add_prod_reason", placeholder="예: 긴급 추가, 수동 추가 등")
+
+                            if st.button("✅ 제품 추가", key="btn_add_product", type="primary"):
+                                final_name = add_product_name.strip() if add_product_name else ""
+                                if not final_name or final_name == DIRECT_INPUT:
+                                    st.error("제품명을 입력 또는 선택해주세요.")
+                                else:
+                                    try:
+                                        week_end = week_start + timedelta(days=4)
+                                        new_row = {
+                                            "week_start": week_start_str,
+                                            "week_end": week_end.strftime('%Y-%m-%d'),
+                                            "day_of_week": add_day,
+                                            "shift": add_shift,
+                                            "product": final_name,
+                                            "quantity": int(add_quantity),
+                                            "production_time": round(float(add_production_time), 1),
+                                            "reason": add_reason.strip() if add_reason else "수동 추가",
+                                            "urgency": 0
+                                        }
+                                        client = get_supabase_client()
+                                        result = client.table("schedules").insert(new_row).execute()
+                                        record_schedule_insert([r["id"] for r in (result.data or []) if "id" in r])
+                                        _clear_schedule_db_caches()
+                                        load_all_product_names.clear()
+                                        st.success(f"✅ **{final_name}** {int(add_quantity)}개 → {add_day} {add_shift}에 추가되었습니다.")
+                                        st.rerun()
+                                    except Exception as e:
+                                        st.error(f"❌ 추가 실패: {str(e)}")
+
+                    _add_product_fragment()
 
                 # ── 컬럼명 rename 사전 (보기 모드용, 한 번만 생성)
                 _col_rename = {
@@ -1639,154 +1966,140 @@ elif menu == "🔍 스케줄 조회":
                     'production_time': '시간(h)', 'reason': '이유'
                 }
 
-                if not is_edit_mode:
-                    # 보기 모드: 데이터프레임으로 표시
+                def _render_day_blocks(render_shift):
+                    """요일별 주간/야간 2열 블록 렌더링 (교대 내용은 render_shift(shift_df, day, shift)가 그림)"""
                     for day in DAYS:
                         dd = day_data_map[day]
                         st.subheader(f"▶ {dd['label']}")
 
                         if not dd['df'].empty:
-                            col1, col2 = st.columns(2)
-                            with col1:
-                                st.markdown("**🌞 주간**")
-                                if not dd['day_shift'].empty:
-                                    st.dataframe(
-                                        dd['day_shift'][['product', 'quantity', 'production_time', 'reason']].rename(columns=_col_rename),
-                                        use_container_width=True, hide_index=True
-                                    )
-                                else:
-                                    st.info("생산 없음")
-                            with col2:
-                                st.markdown("**🌙 야간**")
-                                if not dd['night_shift'].empty:
-                                    st.dataframe(
-                                        dd['night_shift'][['product', 'quantity', 'production_time', 'reason']].rename(columns=_col_rename),
-                                        use_container_width=True, hide_index=True
-                                    )
-                                else:
-                                    st.info("생산 없음")
+                            for col, shift, header in zip(st.columns(2), ['주간', '야간'], ["**🌞 주간**", "**🌙 야간**"]):
+                                with col:
+                                    st.markdown(header)
+                                    shift_df = dd['shifts'].get(shift)
+                                    if shift_df is not None:
+                                        render_shift(shift_df, day, shift)
+                                    else:
+                                        st.info("생산 없음")
                         else:
                             st.info("생산 없음")
                         st.divider()
+
+                if not is_edit_mode:
+                    # 보기 모드: 데이터프레임으로 표시
+                    def _render_shift_table(shift_df, day, shift):
+                        st.dataframe(
+                            shift_df[['product', 'quantity', 'production_time', 'reason']].rename(columns=_col_rename),
+                            use_container_width=True, hide_index=True
+                        )
+
+                    _render_day_blocks(_render_shift_table)
                 else:
-                    # 수정 모드: 삭제/이동/수량수정 버튼 표시
-                    def _render_edit_row(row, day_labels_list):
-                        """수정 모드 단일 행 렌더링 (인라인)"""
-                        rid = row['id']
-                        c_del, c_name, c_qty, c_day, c_shift, c_apply = st.columns([0.5, 2.5, 1.2, 1.8, 1, 0.8])
-                        with c_del:
-                            if st.button("🗑️", key=f"del_{rid}", help="삭제"):
-                                delete_schedule_row(rid)
-                                # 다운로드 캐시 제거
-                                st.session_state.pop(f"_excel_cache_{week_start_str}", None)
-                                st.session_state.pop(f"_img_cache_{week_start_str}", None)
-                                st.rerun()
-                        with c_name:
-                            st.caption(f"**{row['product']}**\n{row['production_time']}h · {row.get('reason', '')}")
-                        with c_qty:
-                            new_qty = st.number_input("수량", min_value=1, value=int(row['quantity']), step=1, key=f"qty_{rid}", label_visibility="collapsed")
-                        with c_day:
-                            current_day_idx = day_labels_list.index(row['day_of_week']) if row['day_of_week'] in day_labels_list else 0
-                            move_day = st.selectbox("요일", day_labels_list, index=current_day_idx, key=f"move_day_{rid}", label_visibility="collapsed")
-                        with c_shift:
-                            current_shift_idx = 0 if row['shift'] == '주간' else 1
-                            move_shift = st.selectbox("교대", ["주간", "야간"], index=current_shift_idx, key=f"move_shift_{rid}", label_visibility="collapsed")
-                        with c_apply:
-                            if st.button("적용", key=f"apply_{rid}"):
-                                qty_changed = int(new_qty) != int(row['quantity'])
-                                moved = move_day != row['day_of_week'] or move_shift != row['shift']
-                                if qty_changed or moved:
-                                    updates_kw = {}
-                                    if moved:
-                                        updates_kw['day_of_week'] = move_day
-                                        updates_kw['shift'] = move_shift
-                                    if qty_changed:
-                                        updates_kw['quantity'] = int(new_qty)
-                                        if int(row['quantity']) > 0:
-                                            time_per_unit = float(row['production_time']) / int(row['quantity'])
-                                            updates_kw['production_time'] = round(int(new_qty) * time_per_unit, 1)
-                                    update_schedule_row(rid, **updates_kw)
-                                    # 다운로드 캐시 제거
-                                    st.session_state.pop(f"_excel_cache_{week_start_str}", None)
-                                    st.session_state.pop(f"_img_cache_{week_start_str}", None)
-                                    st.rerun()
+                    # 수정 모드: 교대별 data_editor로 삭제/이동/수량수정 (수정 완료 시 일괄 반영)
+                    _edit_cols = ['id', 'product', 'quantity', 'production_time', 'day_of_week', 'shift', 'reason']
+                    _editor_config = {
+                        'id': None,
+                        '삭제': st.column_config.CheckboxColumn("삭제", width="small"),
+                        'product': st.column_config.TextColumn("제품", width="medium"),
+                        'quantity': st.column_config.NumberColumn("수량(개)", width="small", min_value=1, step=1, format="%d", required=True),
+                        'production_time': st.column_config.NumberColumn("시간(h)", width="small", format="%.1f"),
+                        'day_of_week': st.column_config.SelectboxColumn("요일", options=day_labels_list, required=True),
+                        'shift': st.column_config.SelectboxColumn("교대", options=["주간", "야간"], required=True),
+                        'reason': st.column_config.TextColumn("이유"),
+                    }
+                    def _render_shift_editor(shift_df, day, shift, new_pending_edits, new_pending_deletes):
+                        """교대 하나의 행들을 data_editor로 렌더링하고 변경 내역을 보류 목록에 수집"""
+                        base = shift_df[_edit_cols].reset_index(drop=True)
+                        base.insert(0, '삭제', False)
+                        # 제품 추가 등으로 행 구성이 바뀌어 편집기가 새로 만들어져도 보류 중인 변경이 유지되도록 초기값에 반영
+                        seeded = base.copy()
+                        seeded['삭제'] = seeded['id'].isin(pending_deletes)
+                        for i, rid in seeded['id'].items():
+                            for col, value in pending_edits.get(int(rid), {}).items():
+                                if col in ('quantity', 'day_of_week', 'shift'):
+                                    seeded.at[i, col] = value
+                        edited = st.data_editor(
+                            seeded,
+                            use_container_width=True,
+                            hide_index=True,
+                            key=f"sched_editor_{day}_{shift}_{hash(tuple(base['id']))}",
+                            disabled=['product', 'production_time', 'reason'],
+                            column_config=_editor_config,
+                        )
+                        new_pending_deletes.update(edited.loc[edited['삭제'], 'id'].tolist())
+                        diff_mask = (
+                            (base['quantity'] != edited['quantity']) |
+                            (base['day_of_week'] != edited['day_of_week']) |
+                            (base['shift'] != edited['shift'])
+                        ) & ~edited['삭제']
+                        # 수량을 비우거나 1 미만으로 입력한 행은 반영하지 않음
+                        new_qty = pd.to_numeric(edited['quantity'], errors='coerce')
+                        invalid_mask = diff_mask & ~(new_qty >= 1)
+                        if invalid_mask.any():
+                            st.warning(f"⚠️ 수량이 비어 있거나 1 미만인 행은 반영되지 않습니다: {', '.join(edited.loc[invalid_mask, 'product'].astype(str))}")
+                        diff_mask &= ~invalid_mask
+                        for (_, orig), (_, row) in zip(base[diff_mask].iterrows(), edited[diff_mask].iterrows()):
+                            updates_kw = {}
+                            if row['day_of_week'] != orig['day_of_week'] or row['shift'] != orig['shift']:
+                                updates_kw['day_of_week'] = row['day_of_week']
+                                updates_kw['shift'] = row['shift']
+                            if int(row['quantity']) != int(orig['quantity']):
+                                updates_kw['quantity'] = int(row['quantity'])
+                                if int(orig['quantity']) > 0:
+                                    time_per_unit = float(orig['production_time']) / int(orig['quantity'])
+                                    updates_kw['production_time'] = round(int(row['quantity']) * time_per_unit, 1)
+                            new_pending_edits[int(orig['id'])] = updates_kw
+
+                    # 편집기 조작은 fragment 범위에서만 재실행 (DB 조회·다운로드 등 페이지 나머지는 건너뜀)
+                    @st.fragment
+                    def _edit_rows_fragment():
+                        pending_caption = st.empty()
+                        new_pending_edits = {}
+                        new_pending_deletes = set()
+                        _render_day_blocks(
+                            lambda shift_df, day, shift: _render_shift_editor(shift_df, day, shift, new_pending_edits, new_pending_deletes)
+                        )
 
-                    for day in DAYS:
-                        dd = day_data_map[day]
-                        st.subheader(f"▶ {dd['label']}")
+                        # 편집기 상태에서 계산한 보류 목록 저장 ('수정 완료' 클릭 시 전체 실행에서 사용)
+                        st.session_state['pending_edits'] = new_pending_edits
+                        st.session_state['pending_deletes'] = new_pending_deletes
+                        pending_count = len(set(new_pending_edits) | new_pending_deletes)
+                        if pending_count:
+                            pending_caption.caption(f"✏️ 반영 대기 중인 변경 {pending_count}건 — 상단 '✔️ 수정 완료'를 눌러 저장하세요.")
 
-                        if not dd['df'].empty:
-                            col1, col2 = st.columns(2)
-                            with col1:
-                                st.markdown("**🌞 주간**")
-                                if not dd['day_shift'].empty:
-                                    for _, row in dd['day_shift'].iterrows():
-                                        with st.container():
-                                            _render_edit_row(row, day_labels_list)
-                                else:
-                                    st.info("생산 없음")
-                            with col2:
-                                st.markdown("**🌙 야간**")
-                                if not dd['night_shift'].empty:
-                                    for _, row in dd['night_shift'].iterrows():
-                                        with st.container():
-                                            _render_edit_row(row, day_labels_list)
-                                else:
-                                    st.info("생산 없음")
-                        else:
-                            st.info("생산 없음")
-                        st.divider()
-                
+                    _edit_rows_fragment()
 
 elif menu == "📈 통계":
     st.header("생산 통계")
     
-    weeks = get_all_weeks()
+    week_labels, week_map = get_week_options()
     
-    if not weeks:
+    if not week_labels:
         st.info("저장된 데이터가 없습니다.")
     else:
-        week_options = [f"{w[0]} ~ {w[1]}" for w in weeks]
-        selected_week = st.selectbox("주차 선택", week_options)
+        selected_week = st.selectbox("주차 선택", week_labels)
         
         if selected_week:
-            week_start = datetime.strptime(weeks[week_options.index(selected_week)][0], '%Y-%m-%d')
-            df = load_schedule_from_db(week_start.strftime('%Y-%m-%d'))
+            week_start_str = week_map[selected_week].strftime('%Y-%m-%d')
+            aggs = compute_week_aggregates(week_start_str)
             
-            if not df.empty:
+            if aggs is not None:
+                # 차트·지표를 모두 준비한 뒤 한 번에 렌더링 (계산과 UI 호출을 섞지 않음)
+                fig_daily, fig_shift, fig_top10 = get_stats_figures(week_start_str, aggs)
+                summary = aggs['summary']
+                metrics = [
+                    ("총 생산량", f"{summary['total_qty']}개"),
+                    ("총 생산시간", f"{summary['total_time']:.1f}시간"),
+                    ("제품 종류", f"{summary['n_products']}개"),
+                    ("평균 긴급도", f"{summary['avg_urgency']:.0f}점"),
+                ]
+
                 col1, col2 = st.columns(2)
-                
-                with col1:
-                    daily_qty = df.groupby('day_of_week')['quantity'].sum().reset_index()
-                    fig1 = px.bar(daily_qty, x='day_of_week', y='quantity',
-                                 title='요일별 총 생산량',
-                                 labels={'day_of_week': '요일', 'quantity': '생산량(개)'},
-                                 color='quantity', color_continuous_scale='Blues')
-                    st.plotly_chart(fig1, use_container_width=True)
-                
-                with col2:
-                    shift_qty = df.groupby('shift')['quantity'].sum().reset_index()
-                    fig2 = px.pie(shift_qty, values='quantity', names='shift',
-                                 title='주간/야간 생산 비율',
-                                 color='shift',
-                                 color_discrete_map={'주간': '#1f77b4', '야간': '#ff7f0e'})
-                    st.plotly_chart(fig2, use_container_width=True)
-                
-                product_qty = df.groupby('product')['quantity'].sum().reset_index().sort_values('quantity', ascending=False).head(10)
-                fig3 = px.bar(product_qty, x='quantity', y='product', orientation='h',
-                             title='제품별 생산량 TOP 10',
-                             labels={'product': '제품', 'quantity': '생산량(개)'},
-                             color='quantity', color_continuous_scale='Greens')
-                st.plotly_chart(fig3, use_container_width=True)
-                
+                col1.plotly_chart(fig_daily, use_container_width=True)
+                col2.plotly_chart(fig_shift, use_container_width=True)
+                st.plotly_chart(fig_top10, use_container_width=True)
+
                 st.subheader("📊 주간 요약")
-                col1, col2, col3, col4 = st.columns(4)
-                with col1:
-                    st.metric("총 생산량", f"{df['quantity'].sum()}개")
-                with col2:
-                    st.metric("총 생산시간", f"{df['production_time'].sum():.1f}시간")
-                with col3:
-                    st.metric("제품 종류", f"{df['product'].nunique()}개")
-                with col4:
-                    st.metric("평균 긴급도", f"{df['urgency'].mean():.0f}점")
+                for col, (label, value) in zip(st.columns(4), metrics):
+                    col.metric(label, value)
 